@@ -0,0 +1,181 @@
+#! /usr/bin/env python3
+
+"""
+JSON codec used by every JSON path in template_python.
+
+Uses orjson when it is installed and falls back to the standard library
+json module otherwise.  The API is bytes-first: ``dumps()`` returns UTF-8
+bytes and ``loads()`` accepts bytes (or str), so records can travel from
+input to sink without intermediate str copies.  Both backends emit compact
+output (no spaces after separators) so logs look the same either way.
+
+Run ``python -m template_python.codec`` to compare backends.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import timeit
+from typing import Any, Callable, Dict, List, NamedTuple
+
+# -----------------------------------------------------------------------------
+# Backends
+# -----------------------------------------------------------------------------
+
+
+class Backend(NamedTuple):
+    """An encoder/decoder pair."""
+
+    name: str
+    dumps: Callable[[Any, bool, bool], bytes]
+    loads: Callable[[bytes | bytearray | memoryview | str], Any]
+
+
+def _stdlib_dumps(obj: Any, sort_keys: bool, indent: bool) -> bytes:
+    if indent:
+        return json.dumps(obj, sort_keys=sort_keys, indent=2, ensure_ascii=False, allow_nan=False).encode("utf-8")
+    return json.dumps(
+        obj, sort_keys=sort_keys, separators=(",", ":"), ensure_ascii=False, allow_nan=False
+    ).encode("utf-8")
+
+
+def _stdlib_loads(data: bytes | bytearray | memoryview | str) -> Any:
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+BACKENDS: Dict[str, Backend] = {
+    "json": Backend("json", _stdlib_dumps, _stdlib_loads),
+}
+
+try:
+    import orjson
+
+    # Hand datetimes, dataclasses and str/int/dict/list subclasses back as unsupported, so the
+    # stdlib fallback below encodes or rejects them exactly as the stdlib backend does.
+
+    _ORJSON_OPTIONS = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_SUBCLASS
+    )
+
+    def _orjson_dumps(obj: Any, sort_keys: bool, indent: bool) -> bytes:
+        option = _ORJSON_OPTIONS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, option=option)
+        except TypeError:
+            # E.g. integers beyond 64 bits or passed-through types.  Let the stdlib encode or reject it.
+            return _stdlib_dumps(obj, sort_keys, indent)
+
+    BACKENDS["orjson"] = Backend("orjson", _orjson_dumps, orjson.loads)
+except ImportError:
+    pass
+
+_backend: Backend = BACKENDS.get("orjson", BACKENDS["json"])
+
+# -----------------------------------------------------------------------------
+# Public API
+# -----------------------------------------------------------------------------
+
+
+def get_backend() -> str:
+    """Return the name of the active backend."""
+    return _backend.name
+
+
+def set_backend(name: str) -> None:
+    """Select a backend by name. Raises KeyError if it is not available."""
+    global _backend  # pylint: disable=global-statement
+    _backend = BACKENDS[name]
+
+
+def dumps(obj: Any, sort_keys: bool = False, indent: bool = False) -> bytes:
+    """Serialize obj to UTF-8 encoded JSON bytes.
+
+    Both backends encode JSON types (dict, list, str, int, float, bool,
+    None), int/float/bool/None keys, and subclasses of these identically.
+    Anything orjson rejects, such as integers beyond 64 bits, datetimes and
+    dataclasses, is retried with the stdlib encoder, so both raise TypeError
+    for those types.  Remaining differences, depending on the backend:
+
+    - NaN and Infinity: the stdlib raises ValueError; orjson emits null.
+    - uuid.UUID and enum.Enum: the stdlib raises TypeError; orjson encodes
+      them as a string and as the member's value.
+    - With sort_keys, the stdlib sorts non-str keys by value (and raises
+      TypeError on mixed str and non-str keys); orjson sorts them as strings.
+    """
+    return _backend.dumps(obj, sort_keys, indent)
+
+
+def dumps_str(obj: Any, sort_keys: bool = False, indent: bool = False) -> str:
+    """Serialize obj to a JSON str. Use only where text is required, e.g. log messages."""
+    return dumps(obj, sort_keys=sort_keys, indent=indent).decode("utf-8")
+
+
+def loads(data: bytes | bytearray | memoryview | str) -> Any:
+    """Deserialize JSON from bytes or str.  Raises json.JSONDecodeError (or a subclass) on bad input."""
+    return _backend.loads(data)
+
+
+# -----------------------------------------------------------------------------
+# Benchmark
+# -----------------------------------------------------------------------------
+
+SAMPLE_RECORD: Dict[str, Any] = {
+    "DATA_SOURCE": "CUSTOMERS",
+    "RECORD_ID": "1001",
+    "RECORD_TYPE": "PERSON",
+    "PRIMARY_NAME_LAST": "Smith",
+    "PRIMARY_NAME_FIRST": "Robert",
+    "DATE_OF_BIRTH": "12/11/1978",
+    "ADDR_TYPE": "MAILING",
+    "ADDR_LINE1": "123 Main Street, Las Vegas NV 89132",
+    "PHONE_TYPE": "HOME",
+    "PHONE_NUMBER": "702-919-1300",
+    "EMAIL_ADDRESS": "bsmith@work.com",
+    "DATE": "1/2/18",
+    "STATUS": "Active",
+    "AMOUNT": "100",
+    "FEATURES": [{"NAME_ORG": "Acme Tire Inc."}, {"ADDR_FULL": "1234 Main St, Las Vegas, NV 89132"}],
+}
+
+
+def _dumps_all(backend: Backend, records: List[Any]) -> None:
+    for record in records:
+        backend.dumps(record, False, False)
+
+
+def _loads_all(backend: Backend, lines: List[bytes]) -> None:
+    for line in lines:
+        backend.loads(line)
+
+
+def benchmark(records: List[Any] | None = None, number: int = 1000) -> Dict[str, Dict[str, float]]:
+    """Time dumps() and loads() for each available backend.
+
+    Returns {backend_name: {"dumps": seconds, "loads": seconds}} for ``number``
+    passes over ``records``.
+    """
+    if records is None:
+        records = [SAMPLE_RECORD]
+    result: Dict[str, Dict[str, float]] = {}
+    for name, backend in BACKENDS.items():
+        encoded = [backend.dumps(record, False, False) for record in records]
+        result[name] = {
+            "dumps": timeit.timeit(functools.partial(_dumps_all, backend, records), number=number),
+            "loads": timeit.timeit(functools.partial(_loads_all, backend, encoded), number=number),
+        }
+    return result
+
+
+if __name__ == "__main__":
+    for backend_name, timings in benchmark(number=10000).items():
+        print("{0:8} dumps: {1:.4f}s  loads: {2:.4f}s".format(backend_name, timings["dumps"], timings["loads"]))
@@ -0,0 +1,242 @@
+#! /usr/bin/env python3
+
+"""
+Parse, validate, canonicalize and cache the Senzing engine configuration JSON.
+
+The schema and the redaction key paths are compiled once at import.  Parsed
+configurations are cached by the SHA-256 of the schema and the raw text in
+memory and, optionally, as canonical JSON files in a cache directory.  Cache
+files hold unredacted secrets, so the directory is created owner-only.  The
+disk cache is best-effort: I/O errors are logged and the parsed result is
+used anyway.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Tuple
+
+from template_python import codec
+
+# -----------------------------------------------------------------------------
+# Schema
+# -----------------------------------------------------------------------------
+
+# Leaves are the expected Python type of the value.  Keys not listed are allowed.
+
+ENGINE_CONFIGURATION_SCHEMA: Dict[str, Any] = {
+    "PIPELINE": {
+        "CONFIGPATH": str,
+        "LICENSEFILE": str,
+        "LICENSESTRINGBASE64": str,
+        "RESOURCEPATH": str,
+        "SUPPORTPATH": str,
+    },
+    "SQL": {
+        "BACKEND": str,
+        "CONNECTION": str,
+    },
+}
+
+ENGINE_CONFIGURATION_REQUIRED: List[str] = [
+    "PIPELINE",
+    "SQL",
+    "SQL.CONNECTION",
+]
+
+# Key paths (fnmatch patterns, case-insensitive) whose values must not be logged.
+
+ENGINE_CONFIGURATION_KEYS_TO_REDACT: List[str] = [
+    "*.CONNECTION",
+    "*.LICENSESTRINGBASE64",
+    "*PASSWORD*",
+]
+
+
+_MISSING = object()
+
+
+def compile_schema(schema: Dict[str, Any], required: Iterable[str] = ()) -> Callable[[Any], List[str]]:
+    """Flatten a nested schema into a validator returning a list of error strings."""
+
+    checks: List[Tuple[Tuple[str, ...], type]] = []
+
+    def flatten(node: Dict[str, Any], prefix: Tuple[str, ...]) -> None:
+        for key, value in node.items():
+            path = prefix + (key,)
+            if isinstance(value, dict):
+                checks.append((path, dict))
+                flatten(value, path)
+            else:
+                checks.append((path, value))
+
+    flatten(schema, ())
+    required_paths = {tuple(path.split(".")) for path in required}
+
+    def validator(document: Any) -> List[str]:
+        if not isinstance(document, dict):
+            return ["expected a JSON object, got {0}".format(type(document).__name__)]
+        errors: List[str] = []
+        values: Dict[Tuple[str, ...], Any] = {(): document}
+
+        # Parents precede children in "checks".  Children of a missing or mistyped parent are skipped.
+
+        for path, expected_type in checks:
+            if path[:-1] not in values:
+                continue
+            node = values[path[:-1]].get(path[-1], _MISSING)
+            if node is _MISSING:
+                if path in required_paths:
+                    errors.append("missing required key {0}".format(".".join(path)))
+            elif not isinstance(node, expected_type):
+                errors.append(
+                    "{0} must be {1}, got {2}".format(".".join(path), expected_type.__name__, type(node).__name__)
+                )
+            else:
+                values[path] = node
+        return errors
+
+    return validator
+
+
+# -----------------------------------------------------------------------------
+# Redaction
+# -----------------------------------------------------------------------------
+
+
+class KeyPathMatcher:
+    """Match dotted key paths (e.g. "SQL.CONNECTION") against fnmatch patterns."""
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        patterns = list(patterns)
+        self._regex = re.compile("|".join(fnmatch.translate(pattern) for pattern in patterns), re.IGNORECASE)
+        self._empty = not patterns
+
+    def matches(self, path: str) -> bool:
+        """Return True if the dotted key path matches a pattern."""
+        return not self._empty and self._regex.match(path) is not None
+
+    def redact(self, document: Any, prefix: str = "") -> Any:
+        """Return a copy of document with matching keys removed, at any depth."""
+        if isinstance(document, dict):
+            result = {}
+            for key, value in document.items():
+                path = "{0}.{1}".format(prefix, key) if prefix else str(key)
+                if not self.matches(path):
+                    result[key] = self.redact(value, path)
+            return result
+        if isinstance(document, list):
+            return [self.redact(value, prefix) for value in document]
+        return document
+
+
+# -----------------------------------------------------------------------------
+# Parsing and caching
+# -----------------------------------------------------------------------------
+
+
+class EngineConfiguration(NamedTuple):
+    """A parsed, validated engine configuration."""
+
+    data: Dict[str, Any]
+    canonical: bytes
+    digest: str
+
+
+VALIDATE_ENGINE_CONFIGURATION = compile_schema(ENGINE_CONFIGURATION_SCHEMA, ENGINE_CONFIGURATION_REQUIRED)
+
+# Part of every cache key, so a schema change never reuses entries validated against the old one.
+
+SCHEMA_DIGEST = hashlib.sha256(
+    repr((ENGINE_CONFIGURATION_SCHEMA, sorted(ENGINE_CONFIGURATION_REQUIRED))).encode("utf-8")
+).hexdigest()
+
+_CACHE: Dict[str, EngineConfiguration] = {}
+
+
+def _parse(raw_bytes: bytes) -> EngineConfiguration:
+    try:
+        data = codec.loads(raw_bytes)
+    except ValueError as err:
+        raise ValueError("invalid JSON: {0}".format(err)) from err
+    errors = VALIDATE_ENGINE_CONFIGURATION(data)
+    if errors:
+        raise ValueError("; ".join(errors))
+    canonical = codec.dumps(data, sort_keys=True)
+    return EngineConfiguration(data, canonical, hashlib.sha256(canonical).hexdigest())
+
+
+def _read_cache_file(path: str) -> EngineConfiguration | None:
+    """Return the cached configuration, or None if the file is missing or corrupt.
+
+    The file holds canonical JSON already validated against the schema named
+    by its key, so it is neither revalidated nor re-canonicalized.
+    """
+    try:
+        with open(path, "rb") as input_file:
+            canonical = input_file.read()
+    except FileNotFoundError:
+        return None
+    except OSError as err:
+        logging.warning("Could not read engine configuration cache file %s: %s", path, err)
+        return None
+    try:
+        data = codec.loads(canonical)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    return EngineConfiguration(data, canonical, hashlib.sha256(canonical).hexdigest())
+
+
+def _write_atomically(path: str, data: bytes) -> None:
+    directory = os.path.dirname(path)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as output_file:
+            output_file.write(data)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def load(raw: str | bytes, cache_dir: str | None = None) -> EngineConfiguration:
+    """Parse and validate raw engine configuration JSON, using the cache when possible.
+
+    Raises ValueError if the JSON is malformed or does not match the schema.
+    Problems with cache_dir are logged as warnings, never raised.
+    """
+    raw_bytes = raw.encode("utf-8") if isinstance(raw, str) else raw
+    key = hashlib.sha256(SCHEMA_DIGEST.encode("utf-8") + raw_bytes).hexdigest()
+
+    result = _CACHE.get(key)
+    if result is not None:
+        return result
+
+    # A corrupt cache file is ignored and rewritten from raw.
+
+    cache_path = os.path.join(cache_dir, "{0}.json".format(key)) if cache_dir else ""
+    if cache_path:
+        result = _read_cache_file(cache_path)
+    if result is None:
+        result = _parse(raw_bytes)
+        if cache_path:
+            try:
+                _write_atomically(cache_path, result.canonical)
+            except OSError as err:
+                logging.warning("Could not write engine configuration cache file %s: %s", cache_path, err)
+
+    _CACHE[key] = result
+    return result
+
+
+def clear_cache() -> None:
+    """Empty the in-memory cache."""
+    _CACHE.clear()
@@ -0,0 +1,273 @@
+#! /usr/bin/env python3
+
+"""
+Out-of-core sort of JSON lines.
+
+Loading records grouped by key (e.g. DATA_SOURCE, RECORD_ID) improves
+locality at the sink.  ``external_sort()`` is a pipeline stage: it consumes
+an iterable of lines and yields them in key order using bounded memory.
+Input is cut into chunks sized from ``memory_budget``, each chunk is sorted
+(optionally in parallel worker processes) and spilled to a temporary "run"
+file, and the runs are combined with a k-way heap merge that is streamed to
+the caller.  Input that fits in one chunk never touches disk.  A ``stop``
+callable, polled per line, aborts the sort with SortInterrupted.
+
+Each line is prefixed, once, with an order-preserving byte encoding of its
+key and a sequence number.  Sorting and merging then compare plain bytes,
+records are never decoded again after run generation, and equal keys keep
+their input order.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import heapq
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Sequence, Tuple
+
+from template_python import codec
+
+DEFAULT_SORT_KEYS: List[str] = ["DATA_SOURCE", "RECORD_ID"]
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+DEFAULT_MAX_FAN_IN = 64
+
+# Bytes per list slot, added to each line's size when filling a chunk.
+
+LIST_SLOT_SIZE = 8
+
+
+class SortInterrupted(Exception):
+    """Raised when ``stop()`` returns True before the sort completes."""
+
+
+# -----------------------------------------------------------------------------
+# Sort keys
+# -----------------------------------------------------------------------------
+
+
+class JsonKey:
+    """Sort key extracting fields from a JSON line.  Picklable, so usable with worker processes."""
+
+    def __init__(self, fields: Sequence[str] = tuple(DEFAULT_SORT_KEYS)) -> None:
+        self.fields = tuple(fields)
+
+    def __call__(self, line: bytes) -> Tuple[str, ...]:
+        """Return the key tuple. Raises ValueError if line is not a JSON object."""
+        record = codec.loads(line)
+        if not isinstance(record, dict):
+            raise ValueError("expected a JSON object, got {0}: {1!r}".format(type(record).__name__, line[:80]))
+        return tuple("" if record.get(field) is None else str(record[field]) for field in self.fields)
+
+
+# Key encoding: each field is UTF-8 with bytes 0x00-0x0A escaped as 0x01 followed by byte + 0x0B, then
+# terminated by 0x00.  Byte order of the encoding matches tuple-of-str order, and it never contains a
+# newline, so encoded lines can still be read back with "for line in file".
+
+_ESCAPE = re.compile(rb"[\x00-\x0a]")
+_SEQUENCE_WIDTH = 16
+
+
+def _escape(match: re.Match[bytes]) -> bytes:
+    return bytes((0x01, match.group()[0] + 0x0B))
+
+
+def _encode_key(fields: Sequence[str]) -> bytes:
+    return b"".join(_ESCAPE.sub(_escape, field.encode("utf-8", "surrogatepass")) + b"\x00" for field in fields)
+
+
+def _encode_lines(lines: List[bytes], start: int, key: Callable[[bytes], Sequence[str]], field_count: int) -> None:
+    """Replace each line, in place, with encoded key + sequence number + line."""
+    for index, line in enumerate(lines):
+        fields = key(line)
+        if len(fields) != field_count:
+            raise ValueError("key returned {0} fields, expected {1}: {2!r}".format(len(fields), field_count, line[:80]))
+        lines[index] = b"%s%016x%s" % (_encode_key(fields), start + index, line)
+
+
+def _decode_line(line: bytes, field_count: int) -> bytes:
+    """Strip the encoded key and sequence number."""
+    return line.split(b"\x00", field_count)[field_count][_SEQUENCE_WIDTH:]
+
+
+# -----------------------------------------------------------------------------
+# Runs
+# -----------------------------------------------------------------------------
+
+
+def _never() -> bool:
+    return False
+
+
+def _chunks(lines: Iterable[bytes], chunk_budget: int, stop: Callable[[], bool]) -> Iterator[Tuple[List[bytes], bool]]:
+    """Group non-blank, newline-terminated lines into chunks of roughly chunk_budget bytes.
+
+    Yields (chunk, is_last).  The last chunk may be empty.
+    """
+    chunk: List[bytes] = []
+    size = 0
+    for line in lines:
+        if stop():
+            raise SortInterrupted()
+        if not line.strip():
+            continue
+        if not line.endswith(b"\n"):
+            line += b"\n"
+        chunk.append(line)
+        size += sys.getsizeof(line) + LIST_SLOT_SIZE
+        if size >= chunk_budget:
+            yield chunk, False
+            chunk = []
+            size = 0
+    yield chunk, True
+
+
+def _write_run(
+    lines: List[bytes], start: int, key: Callable[[bytes], Sequence[str]], field_count: int, directory: str
+) -> str:
+    """Encode, sort, and spill lines to a new run file, then empty the list. Return the file's path."""
+    _encode_lines(lines, start, key, field_count)
+    lines.sort()
+    file_descriptor, path = tempfile.mkstemp(dir=directory, suffix=".run")
+    with os.fdopen(file_descriptor, "wb") as run_file:
+        run_file.writelines(lines)
+    lines.clear()
+    return path
+
+
+def _merge_runs(paths: List[str], stop: Callable[[], bool]) -> Iterator[bytes]:
+    """Stream a k-way merge of encoded run files, deleting them once exhausted."""
+    with contextlib.ExitStack() as stack:
+        run_files = [stack.enter_context(open(path, "rb")) for path in paths]
+        for line in heapq.merge(*run_files):
+            if stop():
+                raise SortInterrupted()
+            yield line
+    for path in paths:
+        os.unlink(path)
+
+
+def _merge_to_run(paths: List[str], directory: str, stop: Callable[[], bool]) -> str:
+    """Merge run files into a single new run file. Return its path."""
+    file_descriptor, path = tempfile.mkstemp(dir=directory, suffix=".run")
+    with os.fdopen(file_descriptor, "wb") as run_file:
+        run_file.writelines(_merge_runs(paths, stop))
+    return path
+
+
+def _generate_runs(
+    head: List[List[bytes]],
+    chunks: Iterator[Tuple[List[bytes], bool]],
+    key: Callable[[bytes], Sequence[str]],
+    field_count: int,
+    directory: str,
+    workers: int,
+) -> List[str]:
+    """Sort and spill head's chunk, then the rest, using up to ``workers`` processes.
+
+    head is emptied as it is consumed so the caller keeps no reference to it.
+    Run order follows input order.
+    """
+
+    def all_chunks() -> Iterator[List[bytes]]:
+        while head:
+            yield head.pop()
+        for chunk, _ in chunks:
+            if chunk:
+                yield chunk
+
+    paths: List[str] = []
+    start = 0
+    if workers <= 1:
+        for chunk in all_chunks():
+            count = len(chunk)
+            paths.append(_write_run(chunk, start, key, field_count, directory))
+            start += count
+        return paths
+
+    # Spawned, not forked: this may run on a ShutdownCoordinator worker thread.
+    # The parent keeps a chunk alive until its future completes, so at most "workers" are pending.
+
+    pending: List[Future[str]] = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        for chunk in all_chunks():
+            if len(pending) >= workers:
+                paths.append(pending.pop(0).result())
+            pending.append(executor.submit(_write_run, chunk, start, key, field_count, directory))
+            start += len(chunk)
+        paths.extend(future.result() for future in pending)
+    return paths
+
+
+# -----------------------------------------------------------------------------
+# Pipeline stage
+# -----------------------------------------------------------------------------
+
+
+def external_sort(
+    lines: Iterable[bytes],
+    key: Callable[[bytes], Sequence[str]] | None = None,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    workers: int = 1,
+    temp_dir: str | None = None,
+    max_fan_in: int = DEFAULT_MAX_FAN_IN,
+    stop: Callable[[], bool] | None = None,
+) -> Iterator[bytes]:
+    """Yield lines sorted by key, keeping record data in memory to roughly memory_budget bytes.
+
+    ``key`` must return the same number of str fields for every line; lines
+    must not contain embedded newlines.  The sort is stable.  The budget
+    covers all processes: with ``workers`` > 1 it is shared by the chunks the
+    parent holds for pending workers and the copies the workers sort, and
+    ``key`` must be picklable (e.g. JsonKey).  When there are more than
+    ``max_fan_in`` runs they are merged in passes so the number of open files
+    stays bounded.  Raises ValueError for lines the key cannot handle and
+    SortInterrupted if ``stop()`` returns True; temporary files are removed
+    either way.
+    """
+    if key is None:
+        key = JsonKey()
+    if stop is None:
+        stop = _never
+    workers = max(1, workers)
+    max_fan_in = max(2, max_fan_in)
+
+    # Serial: one chunk, which grows by its encoded keys while sorting.
+    # Parallel: the chunk being filled, plus "workers" pending in the parent and their copies in the workers.
+
+    if workers == 1:
+        chunk_budget = memory_budget // 2
+    else:
+        chunk_budget = memory_budget // (2 * workers + 2)
+    chunks = _chunks(lines, max(1, chunk_budget), stop)
+
+    head: List[List[bytes]] = []
+    chunk, is_last = next(chunks)
+    if not chunk:
+        return
+    field_count = len(key(chunk[0]))
+
+    # Fast path: everything fits in a single chunk.
+
+    if is_last:
+        _encode_lines(chunk, 0, key, field_count)
+        chunk.sort()
+        for line in chunk:
+            if stop():
+                raise SortInterrupted()
+            yield _decode_line(line, field_count)
+        return
+
+    head.append(chunk)
+    del chunk
+
+    with tempfile.TemporaryDirectory(prefix="template-python-sort-", dir=temp_dir) as directory:
+        runs = _generate_runs(head, chunks, key, field_count, directory, workers)
+        while len(runs) > max_fan_in:
+            runs = [_merge_to_run(runs[i : i + max_fan_in], directory, stop) for i in range(0, len(runs), max_fan_in)]
+        for line in _merge_runs(runs, stop):
+            yield _decode_line(line, field_count)
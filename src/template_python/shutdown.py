@@ -0,0 +1,171 @@
+#! /usr/bin/env python3
+
+"""
+Coordinate a graceful shutdown.
+
+A single threading.Event signals "stop taking new work".  Long-running
+work is started with ``run()``, which executes it on a worker thread under
+``in_flight()`` while the main thread waits for either completion or a
+shutdown request.  After a request the main thread gives the work until the
+drain deadline to stop, so shutdown latency is bounded no matter where the
+work happens to be.  Work should poll ``is_shutdown_requested()`` between
+units and stop taking input once it returns True.
+
+Signals that arrive while no ``run()`` is active exit immediately, as there
+is nothing to drain.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from types import FrameType
+from typing import Callable, Iterator, List
+
+# -----------------------------------------------------------------------------
+# ShutdownCoordinator
+# -----------------------------------------------------------------------------
+
+
+class ShutdownCoordinator:
+    """Track in-flight work and shutdown requests for a process."""
+
+    def __init__(self, drain_timeout_in_seconds: float = 8.0) -> None:
+        self.drain_timeout_in_seconds = drain_timeout_in_seconds
+        self.signal_number: int | None = None
+        self._condition = threading.Condition()
+        self._event = threading.Event()
+        self._flush_callbacks: List[Callable[[], None]] = []
+        self._in_flight = 0
+        self._running = 0
+
+    # -------------------------------------------------------------------------
+    # Shutdown request
+    # -------------------------------------------------------------------------
+
+    def request_shutdown(self, signal_number: int | None = None) -> None:
+        """Stop intake of new work. Safe to call from a signal handler."""
+        if self.signal_number is None:
+            self.signal_number = signal_number
+        self._event.set()
+
+    def is_shutdown_requested(self) -> bool:
+        """Return True once a shutdown has been requested."""
+        return self._event.is_set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until shutdown is requested or timeout expires. Return True if requested."""
+        return self._event.wait(timeout)
+
+    def signal_handler(self, signal_number: int, frame: FrameType | None) -> None:  # pylint: disable=unused-argument
+        """Signal handler: request shutdown.  Exit at once on a second signal or if no run() is active."""
+        if self.is_shutdown_requested():
+            raise SystemExit(1)
+        self.request_shutdown(signal_number)
+        if not self._running:
+            raise SystemExit(0)
+
+    # -------------------------------------------------------------------------
+    # In-flight work
+    # -------------------------------------------------------------------------
+
+    @contextmanager
+    def in_flight(self) -> Iterator[bool]:
+        """Context manager around one unit of work.
+
+        Yields False, without counting the work, if shutdown has already been requested.
+        """
+        with self._condition:
+            if self.is_shutdown_requested():
+                accepted = False
+            else:
+                accepted = True
+                self._in_flight += 1
+        try:
+            yield accepted
+        finally:
+            if accepted:
+                with self._condition:
+                    self._in_flight -= 1
+                    self._condition.notify_all()
+
+    def in_flight_count(self) -> int:
+        """Return the number of units of work currently in flight."""
+        with self._condition:
+            return self._in_flight
+
+    def drain(self, timeout: float | None = None) -> bool:
+        """Wait for in-flight work to finish. Return False if the deadline passed first."""
+        if timeout is None:
+            timeout = self.drain_timeout_in_seconds
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._in_flight > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def run(self, work: Callable[[], None], timeout: float | None = None) -> bool:
+        """Run work on a worker thread under in_flight() and wait for it from the calling thread.
+
+        Returns True once work has finished.  If shutdown is requested first,
+        waits up to timeout for work and other in-flight units to finish and
+        returns False if the deadline passes; the daemon worker thread is then
+        abandoned.  Exceptions raised by work, including SystemExit, are
+        re-raised in the calling thread.
+        """
+        if timeout is None:
+            timeout = self.drain_timeout_in_seconds
+        errors: List[BaseException] = []
+        done = threading.Event()
+
+        def target() -> None:
+            try:
+                with self.in_flight() as accepted:
+                    if accepted:
+                        work()
+            except BaseException as err:  # pylint: disable=broad-exception-caught
+                errors.append(err)
+            finally:
+                done.set()
+
+        self._running += 1
+        try:
+            threading.Thread(target=target, name="shutdown-coordinated-work", daemon=True).start()
+
+            # Poll so signal handlers get to run on this thread.
+
+            while not done.wait(0.1):
+                if self.is_shutdown_requested():
+                    deadline = time.monotonic() + timeout
+                    if not done.wait(timeout) or not self.drain(deadline - time.monotonic()):
+                        return False
+                    break
+        finally:
+            self._running -= 1
+
+        if errors:
+            raise errors[0]
+        return True
+
+    # -------------------------------------------------------------------------
+    # Flushing
+    # -------------------------------------------------------------------------
+
+    def add_flush_callback(self, callback: Callable[[], None]) -> None:
+        """Register a function (e.g. metrics or checkpoint writer) to call on shutdown."""
+        self._flush_callbacks.append(callback)
+
+    def flush(self) -> None:
+        """Call flush callbacks in reverse registration order, then flush log handlers."""
+        for callback in reversed(self._flush_callbacks):
+            try:
+                callback()
+            except Exception:
+                logging.exception("Flush callback %r failed.", callback)
+        for handler in logging.getLogger().handlers:
+            handler.flush()
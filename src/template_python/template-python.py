@@ -24,18 +24,21 @@
 from __future__ import annotations
 
 import argparse
-import json
+import contextlib
 import linecache
 import logging
 import os
 import signal
+import stat
 import sys
+import tempfile
 import time
 from importlib.metadata import PackageNotFoundError, version
 from types import FrameType, TracebackType
 from typing import Any, Callable, Collection, Dict, List
 
-from template_python import example
+from template_python import codec, engine_configuration, example, external_sort
+from template_python.shutdown import ShutdownCoordinator
 
 # Import from https://pypi.org/
 
@@ -68,28 +71,75 @@ CONFIGURATION_LOCATOR: Dict[
     Dict[str, bool | str] | Dict[str, str | None] | Dict[str, str] | Dict[str, object] | Dict[str, int | str],
 ] = {
     "debug": {"default": False, "env": "SENZING_DEBUG", "cli": "debug"},
+    "engine_configuration_cache_dir": {
+        "default": None,
+        "env": "SENZING_ENGINE_CONFIGURATION_CACHE_DIR",
+        "cli": "engine-configuration-cache-dir",
+    },
+    "engine_configuration_json": {
+        "default": None,
+        "env": "SENZING_ENGINE_CONFIGURATION_JSON",
+        "cli": "engine-configuration-json",
+    },
+    "input_file": {"default": None, "env": "SENZING_INPUT_FILE", "cli": "input-file"},
+    "output_file": {"default": None, "env": "SENZING_OUTPUT_FILE", "cli": "output-file"},
     "password": {"default": None, "env": "SENZING_PASSWORD", "cli": "password"},
     "senzing_dir": {
         "default": "/opt/senzing",
         "env": "SENZING_DIR",
         "cli": "senzing-dir",
     },
+    "shutdown_timeout_in_seconds": {
+        "default": 8,
+        "env": "SENZING_SHUTDOWN_TIMEOUT_IN_SECONDS",
+        "cli": "shutdown-timeout-in-seconds",
+    },
     "sleep_time_in_seconds": {
         "default": 0,
         "env": "SENZING_SLEEP_TIME_IN_SECONDS",
         "cli": "sleep-time-in-seconds",
     },
+    "sort_keys": {
+        "default": ",".join(external_sort.DEFAULT_SORT_KEYS),
+        "env": "SENZING_SORT_KEYS",
+        "cli": "sort-keys",
+    },
+    "sort_memory_in_megabytes": {
+        "default": 256,
+        "env": "SENZING_SORT_MEMORY_IN_MEGABYTES",
+        "cli": "sort-memory-in-megabytes",
+    },
+    "sort_temp_dir": {
+        "default": None,
+        "env": "SENZING_SORT_TEMP_DIR",
+        "cli": "sort-temp-dir",
+    },
+    "sort_workers": {
+        "default": 0,
+        "env": "SENZING_SORT_WORKERS",
+        "cli": "sort-workers",
+    },
     "subcommand": {
         "default": None,
         "env": "SENZING_SUBCOMMAND",
     },
 }
 
-# Enumerate keys in 'configuration_locator' that should not be printed to the log.
+# Enumerate key paths (fnmatch patterns, case-insensitive) that should not be printed to the log.
 
 KEYS_TO_REDACT: List[str] = [
     "password",
-]
+] + ["engine_configuration_json." + key for key in engine_configuration.ENGINE_CONFIGURATION_KEYS_TO_REDACT]
+
+REDACTION_MATCHER = engine_configuration.KeyPathMatcher(KEYS_TO_REDACT)
+
+# Subcommands with the "common" argument aspect, which accept --engine-configuration-json.
+
+ENGINE_CONFIGURATION_SUBCOMMANDS: List[str] = ["task1", "task2"]
+
+# Coordinates graceful shutdown. Signal handlers set its event; long-running work runs under run_until_shutdown().
+
+SHUTDOWN = ShutdownCoordinator()
 
 # -----------------------------------------------------------------------------
 # Define argument parser
@@ -130,6 +180,7 @@ def get_parser() -> argparse.ArgumentParser:
         },
         "sleep": {
             "help": "Do nothing but sleep. For Docker testing.",
+            "argument_aspects": ["shutdown"],
             "arguments": {
                 "--sleep-time-in-seconds": {
                     "dest": "sleep_time_in_seconds",
@@ -138,6 +189,42 @@ def get_parser() -> argparse.ArgumentParser:
                 },
             },
         },
+        "sort": {
+            "help": "Sort JSON lines by key, using bounded memory, to improve load locality.",
+            "argument_aspects": ["shutdown"],
+            "arguments": {
+                "--input-file": {
+                    "dest": "input_file",
+                    "metavar": "SENZING_INPUT_FILE",
+                    "help": "File of JSON lines to sort. Default: stdin",
+                },
+                "--output-file": {
+                    "dest": "output_file",
+                    "metavar": "SENZING_OUTPUT_FILE",
+                    "help": "File for sorted JSON lines. Default: stdout",
+                },
+                "--sort-keys": {
+                    "dest": "sort_keys",
+                    "metavar": "SENZING_SORT_KEYS",
+                    "help": "Comma-separated JSON keys to sort by. Default: DATA_SOURCE,RECORD_ID",
+                },
+                "--sort-memory-in-megabytes": {
+                    "dest": "sort_memory_in_megabytes",
+                    "metavar": "SENZING_SORT_MEMORY_IN_MEGABYTES",
+                    "help": "Memory budget for records held in memory. Default: 256",
+                },
+                "--sort-temp-dir": {
+                    "dest": "sort_temp_dir",
+                    "metavar": "SENZING_SORT_TEMP_DIR",
+                    "help": "Directory for sorted runs spilled to disk. Default: system temporary directory",
+                },
+                "--sort-workers": {
+                    "dest": "sort_workers",
+                    "metavar": "SENZING_SORT_WORKERS",
+                    "help": "Processes used to sort runs. Default: 0 (number of CPUs)",
+                },
+            },
+        },
         "version": {
             "help": "Print version of program.",
         },
@@ -160,6 +247,21 @@ def get_parser() -> argparse.ArgumentParser:
                 "metavar": "SENZING_ENGINE_CONFIGURATION_JSON",
                 "help": "Advanced Senzing engine configuration. Default: none",
             },
+            "--engine-configuration-cache-dir": {
+                "dest": "engine_configuration_cache_dir",
+                "metavar": "SENZING_ENGINE_CONFIGURATION_CACHE_DIR",
+                "help": (
+                    "Directory for caching validated engine configurations. Cache files contain unredacted"
+                    " secrets (e.g. SQL.CONNECTION); the directory is created with mode 0700. Default: none"
+                ),
+            },
+        },
+        "shutdown": {
+            "--shutdown-timeout-in-seconds": {
+                "dest": "shutdown_timeout_in_seconds",
+                "metavar": "SENZING_SHUTDOWN_TIMEOUT_IN_SECONDS",
+                "help": "Time allowed to drain in-flight work on shutdown. Default: 8",
+            },
         },
     }
 
@@ -210,6 +312,8 @@ MESSAGE_DEBUG = 900
 
 MESSAGE_DICTIONARY = {
     "100": "senzing-" + SENZING_PRODUCT_ID + "{0:04d}I",
+    "180": "Shutdown requested by signal {0}.",
+    "181": "Drained in-flight work.",
     "292": "Configuration change detected.  Old: {0} New: {1}",
     "293": "For information on warnings and errors, see https://github.com/senzing-garage/stream-loader#errors",
     "294": "Version: {0}  Updated: {1}",
@@ -219,8 +323,16 @@ MESSAGE_DICTIONARY = {
     "298": "Exit {0}",
     "299": "{0}",
     "300": "senzing-" + SENZING_PRODUCT_ID + "{0:04d}W",
+    "380": "Shutdown deadline of {0} seconds exceeded with {1} unit(s) of work in flight.",
     "499": "{0}",
     "500": "senzing-" + SENZING_PRODUCT_ID + "{0:04d}E",
+    "520": "Invalid SENZING_ENGINE_CONFIGURATION_JSON: {0}",
+    "521": "SENZING_SORT_MEMORY_IN_MEGABYTES must be greater than 0. Received: {0}",
+    "522": "SENZING_SORT_WORKERS must not be negative. Received: {0}",
+    "523": "SENZING_INPUT_FILE not found: {0}",
+    "524": "Bad input record: {0}",
+    "525": "Could not sort into {0}. Error: {1}",
+    "526": "Sort interrupted by shutdown request. Output to {0} was not completed.",
     "694": "SENZING_SUBCOMMAND not set: {0}.",
     "695": "Unknown database scheme '{0}' in database url '{1}'",
     "696": "Bad SENZING_SUBCOMMAND: {0}.",
@@ -359,11 +471,28 @@ def get_configuration(subcommand: str, args: argparse.Namespace) -> Dict[str, An
 
     # Special case: Change integer strings to integers.
 
-    integers = ["sleep_time_in_seconds"]
+    integers = ["shutdown_timeout_in_seconds", "sleep_time_in_seconds", "sort_memory_in_megabytes", "sort_workers"]
     for integer in integers:
         integer_string = result.get(integer, "0")
         result[integer] = int(integer_string)  # type: ignore[call-overload]
 
+    # Special case: Parse, validate, and cache engine configuration JSON for subcommands that use it.
+    # Treat the result as read-only.  Other subcommands drop it rather than log it unredacted.
+
+    if result.get("subcommand") in ENGINE_CONFIGURATION_SUBCOMMANDS:
+        engine_configuration_json = result.get("engine_configuration_json")
+        if isinstance(engine_configuration_json, str):
+            try:
+                parsed = engine_configuration.load(
+                    engine_configuration_json, result.get("engine_configuration_cache_dir")
+                )
+                result["engine_configuration_json"] = parsed.data
+            except ValueError as err:
+                exit_error(520, err)
+    else:
+        result.pop("engine_configuration_cache_dir", None)
+        result.pop("engine_configuration_json", None)
+
     return result
 
 
@@ -382,6 +511,18 @@ def validate_configuration(config: Dict[Any, Any]) -> None:
         if not config.get("senzing_dir"):
             user_error_messages.append(message_error(414))
 
+    if subcommand == "sort":
+
+        if config.get("sort_memory_in_megabytes", 0) <= 0:
+            user_error_messages.append(message_error(521, config.get("sort_memory_in_megabytes")))
+
+        if config.get("sort_workers", 0) < 0:
+            user_error_messages.append(message_error(522, config.get("sort_workers")))
+
+        input_file = config.get("input_file")
+        if input_file and not os.path.isfile(input_file):
+            user_error_messages.append(message_error(523, input_file))
+
     # Log warning messages.
 
     for user_warning_message in user_warning_messages:
@@ -404,14 +545,8 @@ def validate_configuration(config: Dict[Any, Any]) -> None:
 
 
 def redact_configuration(config: Dict[Any, Any]) -> Dict[Any, Any]:
-    """Return a shallow copy of config with certain keys removed."""
-    result = config.copy()
-    for key in KEYS_TO_REDACT:
-        try:
-            result.pop(key)
-        except Exception:
-            print(f"Could not pop {key}")
-    return result
+    """Return a copy of config with key paths matching KEYS_TO_REDACT removed, at any depth."""
+    return REDACTION_MATCHER.redact(config)
 
 
 # -----------------------------------------------------------------------------
@@ -420,9 +555,9 @@ def redact_configuration(config: Dict[Any, Any]) -> Dict[Any, Any]:
 
 
 def bootstrap_signal_handler(signal_number: int, frame: FrameType | None) -> Any:
-    """Exit on signal error."""
+    """Request shutdown on signal.  A second signal forces exit."""
     logging.debug(message_debug(901, signal_number, frame))
-    sys.exit(0)
+    SHUTDOWN.signal_handler(signal_number, frame)
 
 
 def create_signal_handler_function(
@@ -433,9 +568,9 @@ def create_signal_handler_function(
     """
 
     def result_function(signal_number: int, frame: FrameType | None) -> None:
-        logging.info(message_info(298, args))
-        logging.debug(message_debug(901, signal_number, frame))
-        sys.exit(0)
+        logging.info(message_info(180, signal_number))
+        logging.debug(message_debug(901, signal_number, frame, args))
+        SHUTDOWN.signal_handler(signal_number, frame)
 
     return result_function
 
@@ -448,7 +583,7 @@ def entry_template(config: Dict[Any, Any]) -> str:
         final_config = config
     else:
         final_config = redact_configuration(config)
-    config_json = json.dumps(final_config, sort_keys=True)
+    config_json = codec.dumps_str(final_config, sort_keys=True)
     return message_info(297, config_json)
 
 
@@ -462,7 +597,7 @@ def exit_template(config: Dict[Any, Any]) -> str:
         final_config = config
     else:
         final_config = redact_configuration(config)
-    config_json = json.dumps(final_config, sort_keys=True)
+    config_json = codec.dumps_str(final_config, sort_keys=True)
     return message_info(298, config_json)
 
 
@@ -478,6 +613,21 @@ def exit_silently() -> None:
     sys.exit(0)
 
 
+def run_until_shutdown(config: Dict[Any, Any], work: Callable[[], None]) -> None:
+    """Run long-running work so a shutdown request drains it within the configured deadline.
+
+    If the deadline passes, flush and exit without waiting for the work.
+    """
+    timeout = int(config.get("shutdown_timeout_in_seconds", SHUTDOWN.drain_timeout_in_seconds))
+    if SHUTDOWN.run(work, timeout):
+        if SHUTDOWN.is_shutdown_requested():
+            logging.info(message_info(181))
+        return
+    logging.warning(message_warning(380, timeout, SHUTDOWN.in_flight_count()))
+    SHUTDOWN.flush()
+    os._exit(1)
+
+
 # -----------------------------------------------------------------------------
 # do_* functions
 #   Common function signature: do_XXX(args)
@@ -536,7 +686,7 @@ def do_task2(subcommand: str, args: argparse.Namespace) -> None:
 
     # Do work.
 
-    config_json = json.dumps(config, sort_keys=True, indent=4)
+    config_json = codec.dumps_str(config, sort_keys=True, indent=True)
     print(config_json)
 
     # Epilog.
@@ -559,17 +709,97 @@ def do_sleep(subcommand: str, args: argparse.Namespace) -> None:
 
     sleep_time_in_seconds = int(config.get("sleep_time_in_seconds", 0))
 
-    # Sleep.
-
-    if sleep_time_in_seconds > 0:
-        logging.info(message_info(296, sleep_time_in_seconds))
-        time.sleep(sleep_time_in_seconds)
+    # Sleep until the time expires or a shutdown is requested.
 
-    else:
-        sleep_time_in_seconds = 3600
-        while True:
+    def sleep() -> None:
+        if sleep_time_in_seconds > 0:
+            logging.info(message_info(296, sleep_time_in_seconds))
+            SHUTDOWN.wait(sleep_time_in_seconds)
+        else:
             logging.info(message_info(295))
-            time.sleep(sleep_time_in_seconds)
+            while not SHUTDOWN.wait(3600):
+                logging.info(message_info(295))
+
+    run_until_shutdown(config, sleep)
+
+    # Epilog.
+
+    logging.info(exit_template(config))
+
+
+def do_sort(subcommand: str, args: argparse.Namespace) -> None:
+    """Sort JSON lines by key with an external merge sort."""
+
+    # Get context from CLI, environment variables, and ini files.
+
+    config = get_configuration(subcommand, args)
+    validate_configuration(config)
+
+    # Prolog.
+
+    logging.info(entry_template(config))
+
+    # Pull values from configuration.
+
+    sort_keys = [sort_key.strip() for sort_key in config["sort_keys"].split(",") if sort_key.strip()]
+    memory_budget = config["sort_memory_in_megabytes"] * MEGABYTES
+    workers = config["sort_workers"] or os.cpu_count() or 1
+    output_path = config.get("output_file")
+
+    # mkstemp() creates 0600 files.  Give the output the mode of the file it replaces, or 0666 less the umask.
+
+    output_mode = 0
+    if output_path:
+        if os.path.exists(output_path):
+            output_mode = stat.S_IMODE(os.stat(output_path).st_mode)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            output_mode = 0o666 & ~umask
+
+    # Do work.  Output goes to a temporary file that replaces output_path only when the sort completes.
+
+    def sort() -> None:
+        temporary_path = ""
+        try:
+            with contextlib.ExitStack() as stack:
+                input_file = (
+                    stack.enter_context(open(config["input_file"], "rb"))
+                    if config.get("input_file")
+                    else sys.stdin.buffer
+                )
+                output_file = sys.stdout.buffer
+                if output_path:
+                    file_descriptor, temporary_path = tempfile.mkstemp(
+                        dir=os.path.dirname(os.path.abspath(output_path)), suffix=".tmp"
+                    )
+                    output_file = stack.enter_context(os.fdopen(file_descriptor, "wb"))
+                    os.chmod(temporary_path, output_mode)
+                output_file.writelines(
+                    external_sort.external_sort(
+                        input_file,
+                        key=external_sort.JsonKey(sort_keys),
+                        memory_budget=memory_budget,
+                        workers=workers,
+                        temp_dir=config.get("sort_temp_dir"),
+                        stop=SHUTDOWN.is_shutdown_requested,
+                    )
+                )
+                output_file.flush()
+            if temporary_path:
+                os.replace(temporary_path, output_path)
+                temporary_path = ""
+        except external_sort.SortInterrupted:
+            exit_error(526, output_path or "stdout")
+        except ValueError as err:
+            exit_error(524, err)
+        except OSError as err:
+            exit_error(525, output_path or "stdout", err)
+        finally:
+            if temporary_path:
+                os.unlink(temporary_path)
+
+    run_until_shutdown(config, sort)
 
     # Epilog.
 
@@ -648,8 +878,12 @@ def main() -> None:
         exit_silently()
 
     # Tricky code for calling function based on string.
+    # Flush logs, metrics, and checkpoints on every exit, including exit_error() and a second signal.
 
-    globals()[subcommand_function_name](subcommand, args)
+    try:
+        globals()[subcommand_function_name](subcommand, args)
+    finally:
+        SHUTDOWN.flush()
 
 
 if __name__ == "__main__":
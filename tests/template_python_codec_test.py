@@ -0,0 +1,126 @@
+"""Tests for template_python.codec."""
+
+import dataclasses
+import datetime
+import enum
+import json
+import uuid
+from typing import Iterator
+
+import pytest
+
+from template_python import codec
+
+class Name(str):
+    """A str subclass."""
+
+
+class Level(enum.IntEnum):
+    """An int subclass."""
+
+    HIGH = 2
+
+
+class Color(enum.Enum):
+    """A plain Enum."""
+
+    RED = 1
+
+
+@dataclasses.dataclass
+class Point:
+    """A dataclass."""
+
+    x: int = 1
+
+
+RECORD = {"RECORD_ID": "1", "DATA_SOURCE": "TEST", "NAME": "José", "AMOUNT": 10, "TAGS": [1, 2.5, None, True]}
+
+
+@pytest.fixture(name="backend", params=sorted(codec.BACKENDS))
+def fixture_backend(request: pytest.FixtureRequest) -> Iterator[str]:
+    """Run a test against every available backend."""
+    previous = codec.get_backend()
+    codec.set_backend(request.param)
+    yield request.param
+    codec.set_backend(previous)
+
+
+@pytest.mark.usefixtures("backend")
+def test_round_trip() -> None:
+    """dumps() returns bytes that loads() restores."""
+    encoded = codec.dumps(RECORD)
+    assert isinstance(encoded, bytes)
+    assert codec.loads(encoded) == RECORD
+    assert codec.loads(encoded.decode("utf-8")) == RECORD
+    assert codec.loads(memoryview(encoded)) == RECORD
+
+
+@pytest.mark.skipif("orjson" not in codec.BACKENDS, reason="orjson is not installed")
+@pytest.mark.parametrize("indent", [False, True])
+@pytest.mark.parametrize(
+    "document",
+    [RECORD, {1: "int key", 2: None}, {"big": 2**70}, [True, None, -1.5], {Name("key"): [Name("value"), Level.HIGH]}],
+)
+def test_backends_agree(document: object, indent: bool) -> None:
+    """orjson and the stdlib produce identical output."""
+    stdlib = codec.BACKENDS["json"].dumps(document, True, indent)
+    assert codec.BACKENDS["orjson"].dumps(document, True, indent) == stdlib
+
+
+@pytest.mark.usefixtures("backend")
+@pytest.mark.parametrize(
+    "value",
+    [object(), datetime.date(2024, 1, 1), datetime.datetime(2024, 1, 1), Point()],
+    ids=["object", "date", "datetime", "dataclass"],
+)
+def test_dumps_unserializable(value: object) -> None:
+    """Non-JSON types both backends reject raise TypeError."""
+    with pytest.raises(TypeError):
+        codec.dumps({"value": value})
+
+
+@pytest.mark.skipif("orjson" not in codec.BACKENDS, reason="orjson is not installed")
+def test_backends_known_differences() -> None:
+    """Differences documented in codec.dumps()."""
+    stdlib = codec.BACKENDS["json"].dumps
+    fast = codec.BACKENDS["orjson"].dumps
+    with pytest.raises(ValueError):
+        stdlib(float("nan"), False, False)
+    assert fast(float("nan"), False, False) == b"null"
+    with pytest.raises(TypeError):
+        stdlib(uuid.UUID(int=1), False, False)
+    assert fast(uuid.UUID(int=1), False, False) == b'"00000000-0000-0000-0000-000000000001"'
+    with pytest.raises(TypeError):
+        stdlib(Color.RED, False, False)
+    assert fast(Color.RED, False, False) == b"1"
+
+
+@pytest.mark.usefixtures("backend")
+def test_indent() -> None:
+    """Indented output is valid JSON spanning multiple lines."""
+    result = codec.dumps_str(RECORD, sort_keys=True, indent=True)
+    assert "\n" in result
+    assert json.loads(result) == RECORD
+
+
+@pytest.mark.usefixtures("backend")
+def test_loads_error() -> None:
+    """Bad input raises json.JSONDecodeError for every backend."""
+    with pytest.raises(json.JSONDecodeError):
+        codec.loads(b"{not json")
+
+
+def test_set_backend_unknown() -> None:
+    """Unknown backend names are rejected."""
+    with pytest.raises(KeyError):
+        codec.set_backend("no-such-backend")
+
+
+def test_benchmark() -> None:
+    """benchmark() reports timings for each backend."""
+    result = codec.benchmark(number=1)
+    assert set(result) == set(codec.BACKENDS)
+    for timings in result.values():
+        assert timings["dumps"] >= 0
+        assert timings["loads"] >= 0
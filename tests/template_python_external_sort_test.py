@@ -0,0 +1,109 @@
+"""Tests for template_python.external_sort."""
+
+import json
+import os
+import random
+import tracemalloc
+from pathlib import Path
+from typing import Iterator, List
+
+import pytest
+
+from template_python import external_sort
+
+
+def make_lines(count: int) -> List[bytes]:
+    """Build shuffled JSON lines with duplicate keys."""
+    rng = random.Random(42)
+    records = [
+        {"DATA_SOURCE": rng.choice(["CUSTOMERS", "WATCHLIST"]), "RECORD_ID": str(rng.randint(0, count // 2)), "N": i}
+        for i in range(count)
+    ]
+    return [json.dumps(record).encode("utf-8") + b"\n" for record in records]
+
+
+def expected(lines: List[bytes]) -> List[bytes]:
+    """Reference result: Python's stable in-memory sort."""
+    return sorted(lines, key=external_sort.JsonKey())
+
+
+def test_in_memory() -> None:
+    """Input that fits the budget is sorted without spilling."""
+    lines = make_lines(100)
+    assert list(external_sort.external_sort(lines)) == expected(lines)
+
+
+def test_spills_and_merges(tmp_path: Path) -> None:
+    """Small budgets produce many runs that are merged stably, in passes, and cleaned up."""
+    lines = make_lines(2000)
+    result = list(external_sort.external_sort(lines, memory_budget=4096, temp_dir=str(tmp_path), max_fan_in=4))
+    assert result == expected(lines)
+    assert not os.listdir(tmp_path)
+
+
+def test_parallel_run_generation(tmp_path: Path) -> None:
+    """Worker processes produce the same result as a single process."""
+    lines = make_lines(2000)
+    result = list(external_sort.external_sort(lines, memory_budget=16384, workers=2, temp_dir=str(tmp_path)))
+    assert result == expected(lines)
+
+
+def test_custom_key_and_blank_lines() -> None:
+    """Blank lines are dropped and missing newlines are added."""
+    lines = [b'{"RECORD_ID": "2"}', b"\n", b'{"RECORD_ID": "1"}\n', b""]
+    result = list(external_sort.external_sort(lines, key=external_sort.JsonKey(["RECORD_ID"]), memory_budget=1))
+    assert result == [b'{"RECORD_ID": "1"}\n', b'{"RECORD_ID": "2"}\n']
+
+
+def test_bad_json() -> None:
+    """Lines that are not JSON raise ValueError."""
+    with pytest.raises(ValueError):
+        list(external_sort.external_sort([b"not json\n", b"{}\n"]))
+
+
+def test_non_object_json() -> None:
+    """JSON values that are not objects raise ValueError."""
+    with pytest.raises(ValueError, match="expected a JSON object"):
+        list(external_sort.external_sort([b"[1]\n", b"{}\n"]))
+
+
+@pytest.mark.parametrize("stop_after", [10, 1500])
+def test_stop_interrupts_and_cleans_up(tmp_path: Path, stop_after: int) -> None:
+    """stop() aborts during intake or during the merge, and temporary files are removed."""
+    calls = []
+
+    def stop() -> bool:
+        calls.append(1)
+        return len(calls) > stop_after
+
+    lines = make_lines(1000)
+    with pytest.raises(external_sort.SortInterrupted):
+        list(external_sort.external_sort(lines, memory_budget=4096, temp_dir=str(tmp_path), stop=stop))
+    assert not os.listdir(tmp_path)
+
+
+def test_key_encoding_preserves_order() -> None:
+    """Encoded keys compare like the tuples they encode, including control characters and prefixes."""
+    values = ["", "a", "a\x00", "a\x00b", "a\x01", "a\n", "a\x0b", "ab", "b", "\u00e9", "\ud800", "\U0001f600"]
+    keys = [(first, second) for first in values for second in values]
+    encoded = [external_sort._encode_key(key) for key in keys]  # pylint: disable=protected-access
+    assert sorted(keys) == [keys[encoded.index(value)] for value in sorted(encoded)]
+    assert not any(b"\n" in value for value in encoded)
+
+
+def test_peak_memory_within_budget(tmp_path: Path) -> None:
+    """Python allocations stay near the budget when the input is far larger than it."""
+    budget = 512 * 1024
+
+    def generate() -> Iterator[bytes]:
+        for i in range(40000):
+            yield b'{"DATA_SOURCE": "CUSTOMERS", "RECORD_ID": "%d", "NAME": "%s"}\n' % (i * 7919 % 40000, b"x" * 40)
+
+    tracemalloc.start()
+    try:
+        count = sum(1 for _ in external_sort.external_sort(generate(), memory_budget=budget, temp_dir=str(tmp_path)))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert count == 40000
+    assert peak < 1.5 * budget
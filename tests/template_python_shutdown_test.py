@@ -0,0 +1,145 @@
+"""Tests for template_python.shutdown."""
+
+import signal
+import threading
+import time
+
+import pytest
+
+from template_python.shutdown import ShutdownCoordinator
+
+
+def test_wait_returns_when_shutdown_requested() -> None:
+    """wait() unblocks on request_shutdown() and reports it."""
+    coordinator = ShutdownCoordinator()
+    assert coordinator.wait(0.01) is False
+    threading.Timer(0.01, coordinator.request_shutdown).start()
+    assert coordinator.wait(5) is True
+    assert coordinator.is_shutdown_requested()
+
+
+def test_in_flight_rejects_work_after_shutdown() -> None:
+    """No new work is accepted once shutdown is requested."""
+    coordinator = ShutdownCoordinator()
+    with coordinator.in_flight() as accepted:
+        assert accepted
+        assert coordinator.in_flight_count() == 1
+    coordinator.request_shutdown()
+    with coordinator.in_flight() as accepted:
+        assert not accepted
+        assert coordinator.in_flight_count() == 0
+
+
+def test_drain_waits_for_in_flight_work() -> None:
+    """drain() returns True once the worker finishes its batch."""
+    coordinator = ShutdownCoordinator()
+    started = threading.Event()
+
+    def worker() -> None:
+        with coordinator.in_flight():
+            started.set()
+            time.sleep(0.05)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    started.wait(5)
+    coordinator.request_shutdown()
+    assert coordinator.drain(timeout=5) is True
+    thread.join()
+
+
+def test_drain_respects_deadline() -> None:
+    """drain() gives up when the deadline passes."""
+    coordinator = ShutdownCoordinator()
+    release = threading.Event()
+    started = threading.Event()
+
+    def worker() -> None:
+        with coordinator.in_flight():
+            started.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    started.wait(5)
+    assert coordinator.drain(timeout=0.05) is False
+    release.set()
+    thread.join()
+
+
+def test_flush_calls_callbacks_in_reverse_order() -> None:
+    """Callbacks registered last are flushed first."""
+    coordinator = ShutdownCoordinator()
+    calls = []
+    coordinator.add_flush_callback(lambda: calls.append("metrics"))
+    coordinator.add_flush_callback(lambda: calls.append("checkpoint"))
+    coordinator.flush()
+    assert calls == ["checkpoint", "metrics"]
+
+
+def test_signal_exits_when_nothing_is_running() -> None:
+    """Without run() there is nothing to drain, so a signal exits at once."""
+    coordinator = ShutdownCoordinator()
+    with pytest.raises(SystemExit) as exc_info:
+        coordinator.signal_handler(signal.SIGTERM, None)
+    assert exc_info.value.code == 0
+    assert coordinator.signal_number == signal.SIGTERM
+
+
+def test_second_signal_forces_exit() -> None:
+    """During run() the first signal requests shutdown; the second exits."""
+    coordinator = ShutdownCoordinator()
+    results = []
+
+    def work() -> None:
+        coordinator.signal_handler(signal.SIGTERM, None)
+        with pytest.raises(SystemExit) as exc_info:
+            coordinator.signal_handler(signal.SIGTERM, None)
+        results.append(exc_info.value.code)
+
+    assert coordinator.run(work) is True
+    assert coordinator.is_shutdown_requested()
+    assert results == [1]
+
+
+def test_run_returns_when_work_finishes() -> None:
+    """run() returns True as soon as work finishes, without a shutdown request."""
+    coordinator = ShutdownCoordinator()
+    calls = []
+    assert coordinator.run(lambda: calls.append(coordinator.in_flight_count())) is True
+    assert calls == [1]
+    assert not coordinator.is_shutdown_requested()
+
+
+def test_run_drains_cooperative_work() -> None:
+    """Work that polls the event stops and run() reports success."""
+    coordinator = ShutdownCoordinator()
+
+    def work() -> None:
+        while not coordinator.wait(0.01):
+            pass
+
+    threading.Timer(0.05, coordinator.request_shutdown).start()
+    assert coordinator.run(work, timeout=5) is True
+
+
+def test_run_enforces_deadline_while_work_is_running() -> None:
+    """Work that ignores the request is abandoned once the deadline passes."""
+    coordinator = ShutdownCoordinator()
+    release = threading.Event()
+    threading.Timer(0.05, coordinator.request_shutdown).start()
+    start = time.monotonic()
+    assert coordinator.run(lambda: release.wait(5), timeout=0.1) is False
+    assert time.monotonic() - start < 2
+    release.set()
+
+
+def test_run_reraises_work_exceptions() -> None:
+    """Exceptions, including SystemExit, propagate to the caller."""
+    coordinator = ShutdownCoordinator()
+
+    def work() -> None:
+        raise SystemExit(1)
+
+    with pytest.raises(SystemExit):
+        coordinator.run(work)